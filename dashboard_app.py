@@ -1,70 +1,124 @@
+import contextlib
+import functools
+import os
+import tempfile
+
 from plotly.data import gapminder
-from dash import dcc, html, Dash, callback, Input, Output
+from dash import dcc, html, dash_table, Dash, callback, clientside_callback, Input, Output, State
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
+import numpy as np
+import pandas as pd
+
+# Serialize figures with orjson when it is installed (pip install orjson); without it plotly's
+# "auto" engine keeps using its json encoder, so orjson stays an optional speedup
+try:
+    import orjson  # noqa: F401
+except ImportError:
+    pass
+else:
+    pio.json.config.default_engine = "orjson"
 
 css = ["https://cdn.jsdelivr.net/npm/bootstrap@5.3.1/dist/css/bootstrap.min.css", ]
 app = Dash(name="Gapminder Dashboard", external_stylesheets=css)
 
 ################### DATASET ####################################
-gapminder_df = gapminder(datetimes=True, centroids=True, pretty_names=True)
-gapminder_df["Year"] = gapminder_df.Year.dt.year
+# Bump whenever the preparation in load_gapminder changes so stale caches are ignored
+CACHE_VERSION = 1
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"gapminder_pretty_v{CACHE_VERSION}.parquet")
+
+def write_cache(df):
+    # Write to a temp file and rename it into place so concurrent workers never read a partial file;
+    # an unwritable directory (e.g. a read-only deploy) or a missing parquet engine just means no cache
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(CACHE_PATH), suffix=".tmp.parquet")
+    except OSError:
+        return
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, CACHE_PATH)
+    except (OSError, ImportError):
+        pass
+    finally:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+
+@functools.lru_cache(maxsize=1)
+def load_gapminder():
+    try:
+        return pd.read_parquet(CACHE_PATH)
+    except (OSError, ValueError, ImportError):
+        # Missing or unreadable cache, or no parquet engine installed: rebuild it
+        pass
+
+    df = gapminder(datetimes=True, centroids=True, pretty_names=True)
+    df["Year"] = df.Year.dt.year
+    df = df.astype({"Year": "int16", "Population": "int32", "ISO Numeric Country Code": "int16",
+                    "Continent": "category"})
+    write_cache(df)
+    return df
+
+gapminder_df = load_gapminder()
+
+#################### PRECOMPUTED SLICES #########################
+METRICS = ("Population", "GDP per Capita", "Life Expectancy")
+METRIC_COLS = {"Population": "Population", "GDP": "GDP per Capita", "Life": "Life Expectancy"}
+
+YEAR_SLICES = {int(year): df for year, df in gapminder_df.groupby("Year", sort=False)}
+CONTINENT_YEAR_SLICES = {(continent, int(year)): df
+                         for (continent, year), df in gapminder_df.groupby(["Continent", "Year"], sort=False, observed=True)}
+
+TOP15 = {}
+for (continent, year), df in CONTINENT_YEAR_SLICES.items():
+    for metric in METRICS:
+        TOP15[(continent, int(year), metric)] = df.nlargest(15, metric)
 
 #################### CHARTS #####################################
-def create_table():
-    fig = go.Figure(data=[go.Table(
-        header=dict(values=gapminder_df.columns, align='left'),
-        cells=dict(values=gapminder_df.values.T, align='left'))
-    ]
-    )
-    fig.update_layout(paper_bgcolor="#e5ecf6", margin={"t":0, "l":0, "r":0, "b":0}, height=700)
-    return fig
-
-def create_population_chart(continent="Asia", year=1952, ):
-    filtered_df = gapminder_df[(gapminder_df.Continent==continent) & (gapminder_df.Year==year)]
-    filtered_df = filtered_df.sort_values(by="Population", ascending=False).head(15)
-
-    fig = px.bar(filtered_df, x="Country", y="Population", color="Country",
-                   title="Country {} for {} Continent in {}".format("Population", continent, year),
-                   text_auto=True)
-    fig.update_layout(paper_bgcolor="#e5ecf6", height=600)
-    return fig
-
-def create_gdp_chart(continent="Asia", year=1952):
-    filtered_df = gapminder_df[(gapminder_df.Continent==continent) & (gapminder_df.Year==year)]
-    filtered_df = filtered_df.sort_values(by="GDP per Capita", ascending=False).head(15)
-
-    fig = px.bar(filtered_df, x="Country", y="GDP per Capita", color="Country",
-                   title="Country {} for {} Continent in {}".format("GDP per Capita", continent, year),
-                   text_auto=True)
-    fig.update_layout(paper_bgcolor="#e5ecf6", height=600)
-    return fig
-
-def create_life_exp_chart(continent="Asia", year=1952):
-    filtered_df = gapminder_df[(gapminder_df.Continent==continent) & (gapminder_df.Year==year)]
-    filtered_df = filtered_df.sort_values(by="Life Expectancy", ascending=False).head(15)
-
-    fig = px.bar(filtered_df, x="Country", y="Life Expectancy", color="Country",
-                   title="Country {} for {} Continent in {}".format("Life Expectancy", continent, year),
-                   text_auto=True)
-    fig.update_layout(paper_bgcolor="#e5ecf6", height=600)
+BAR_LAYOUT = dict(paper_bgcolor="#e5ecf6", height=600)
+MAP_LAYOUT = dict(dragmode=False, paper_bgcolor="#e5ecf6", height=600, margin={"l":0, "r":0})
+BAR_COLORS = px.colors.qualitative.Plotly
+
+def cached_figure(factory):
+    # Memoize a figure factory's JSON dict (Dash accepts dict figures) so hits skip re-validation;
+    # callers get a shallow copy so top-level reassignment can't touch the cached entry
+    cached = functools.lru_cache(maxsize=256)(lambda *args, **kwargs: factory(*args, **kwargs).to_plotly_json())
+
+    @functools.wraps(factory)
+    def wrapper(*args, **kwargs):
+        return dict(cached(*args, **kwargs))
+    wrapper.cache_info = cached.cache_info
+    return wrapper
+
+def create_metric_chart(metric_key, continent="Asia", year=1952):
+    col = METRIC_COLS[metric_key]
+    filtered_df = TOP15[(continent, int(year), col)]
+
+    fig = go.Figure(
+        data=[go.Bar(x=filtered_df["Country"].to_numpy(), y=np.ascontiguousarray(filtered_df[col].to_numpy()),
+                     texttemplate="%{y}",
+                     marker=dict(color=[BAR_COLORS[i % len(BAR_COLORS)] for i in range(len(filtered_df))]),
+                     hovertemplate="Country=%{x}<br>" + col + "=%{y}<extra></extra>")],
+        layout=dict(BAR_LAYOUT, title=dict(text="Country {} for {} Continent in {}".format(col, continent, year)),
+                    xaxis=dict(title=dict(text="Country")), yaxis=dict(title=dict(text=col))))
     return fig
 
+@cached_figure
 def create_choropleth_map(variable, year):
-    filtered_df = gapminder_df[gapminder_df.Year==year]
-
-    fig = px.choropleth(filtered_df, color=variable,
-                        locations="ISO Alpha Country Code", locationmode="ISO-3",
-                        color_continuous_scale="RdYlBu", hover_data=["Country", variable],
-                        title="{} Choropleth Map [{}]".format(variable, year)
-                     )
-
-    fig.update_layout(dragmode=False, paper_bgcolor="#e5ecf6", height=600, margin={"l":0, "r":0})
+    filtered_df = YEAR_SLICES[int(year)]
+
+    fig = go.Figure(
+        data=[go.Choropleth(locations=filtered_df["ISO Alpha Country Code"].to_numpy(), locationmode="ISO-3",
+                            z=np.ascontiguousarray(filtered_df[variable].to_numpy()), colorscale="RdYlBu",
+                            colorbar=dict(title=dict(text=variable)), text=filtered_df["Country"].to_numpy(),
+                            hovertemplate="ISO Alpha Country Code=%{location}<br>Country=%{text}<br>" + variable + "=%{z}<extra></extra>")],
+        layout=dict(MAP_LAYOUT, title=dict(text="{} Choropleth Map [{}]".format(variable, year))))
     return fig
 
 ##################### WIDGETS ####################################
-continents = gapminder_df.Continent.unique()
-years = gapminder_df.Year.unique()
+continents = list(gapminder_df["Continent"].cat.categories)
+years = np.sort(gapminder_df["Year"].unique()).tolist()
 
 cont_population = dcc.Dropdown(id="cont_pop", options=continents, value="Asia",clearable=False)
 year_population = dcc.Dropdown(id="year_pop", options=years, value=1952,clearable=False)
@@ -79,14 +133,31 @@ year_map = dcc.Dropdown(id="year_map", options=years, value=1952,clearable=False
 var_map = dcc.Dropdown(id="var_map", options=["Population", "GDP per Capita", "Life Expectancy"],
                         value="Life Expectancy",clearable=False)
 
+dataset_table = dash_table.DataTable(id="dataset-table", columns=[{"name": c, "id": c} for c in gapminder_df.columns],
+                                     data=gapminder_df.to_dict("records"), virtualization=True, page_size=50,
+                                     fixed_rows={"headers": True}, style_table={"height": "700px", "overflowY": "auto"})
+
+##################### PRECOMPUTED FIGURES ####################################
+# Each bar chart is fixed by (metric, continent, year): ship them all once and pick one client-side
+FIGS = {}
+for metric_key in METRIC_COLS:
+    for continent in continents:
+        for year in years:
+            fig = create_metric_chart(metric_key, continent, year).to_plotly_json()
+            layout = dict(fig["layout"])
+            # All charts share one template: ship it once and merge it back in client-side
+            FIGS["template"] = layout.pop("template", None)
+            FIGS[f"{metric_key}|{continent}|{year}"] = dict(fig, layout=layout)
+
 ##################### APP LAYOUT ####################################
 app.layout = html.Div([
+    dcc.Store(id="figstore", data=FIGS),
     html.Div([
         html.H1("Gapminder Dataset Analysis", className="text-center fw-bold m-2"),
         html.Br(),
         dcc.Tabs([
             dcc.Tab([html.Br(),
-                     dcc.Graph(id="dataset", figure=create_table())], label="Dataset"),
+                     dataset_table], label="Dataset"),
             dcc.Tab([html.Br(), "Continent", cont_population, "Year", year_population, html.Br(),
                      dcc.Graph(id="population")], label="Population"),
             dcc.Tab([html.Br(), "Continent", cont_gdp, "Year", year_gdp, html.Br(),
@@ -100,17 +171,17 @@ app.layout = html.Div([
 ], style={"background-color": "#e5ecf6", "height": "100vh"})
 
 ##################### CALLBACKS ####################################
-@callback(Output("population", "figure"), [Input("cont_pop", "value"), Input("year_pop", "value"),])
-def update_population_chart(continent, year):
-    return create_population_chart(continent, year)
-
-@callback(Output("gdp", "figure"), [Input("cont_gdp", "value"), Input("year_gdp", "value"),])
-def update_gdp_chart(continent, year):
-    return create_gdp_chart(continent, year)
-
-@callback(Output("life_expectancy", "figure"), [Input("cont_life_exp", "value"), Input("year_life_exp", "value"),])
-def update_life_exp_chart(continent, year):
-    return create_life_exp_chart(continent, year)
+PICK_FIGURE_JS = """function(continent, year, figs) {
+    var fig = figs['%s|' + continent + '|' + year];
+    return {data: fig.data, layout: Object.assign({template: figs.template}, fig.layout)};
+}"""
+
+clientside_callback(PICK_FIGURE_JS % "Population", Output("population", "figure"),
+                    Input("cont_pop", "value"), Input("year_pop", "value"), State("figstore", "data"))
+clientside_callback(PICK_FIGURE_JS % "GDP", Output("gdp", "figure"),
+                    Input("cont_gdp", "value"), Input("year_gdp", "value"), State("figstore", "data"))
+clientside_callback(PICK_FIGURE_JS % "Life", Output("life_expectancy", "figure"),
+                    Input("cont_life_exp", "value"), Input("year_life_exp", "value"), State("figstore", "data"))
 
 @callback(Output("choropleth_map", "figure"), [Input("var_map", "value"), Input("year_map", "value"),])
 def update_map(var_map, year):
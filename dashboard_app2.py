@@ -1,33 +1,101 @@
+import contextlib
+import functools
+import io
+import os
+import tempfile
+
 from plotly.data import gapminder
-from dash import dcc, html, Dash, callback, Input, Output
+from dash import dcc, html, dash_table, Dash, callback, clientside_callback, Input, Output, State
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# 已安装 orjson（pip install orjson）时用它序列化图表；未安装时沿用 plotly "auto" 引擎的 json 编码，
+# orjson 只是可选的加速项
+try:
+    import orjson  # noqa: F401
+except ImportError:
+    pass
+else:
+    pio.json.config.default_engine = "orjson"
 
 # External CSS (Bootstrap)
 css = ["https://cdn.jsdelivr.net/npm/bootstrap@5.3.1/dist/css/bootstrap.min.css"]
 app = Dash(name="Gapminder Dashboard", external_stylesheets=css)
 
 ################### DATASET ####################################
-# 使用 gapminder()（注意：你原先使用了 gapminder(datetimes=True, centroids=True, pretty_names=True)）
-# 保持兼容性：为确保 datetimes 可用，按你的环境选择相应调用；这里示例使用基本 gapminder()
-gapminder_df = gapminder()
-# 标准化列名（根据你原数据的列名）
-# 如果你的 gapminder 返回的是其他列名，请调整下面的列名映射
-gapminder_df = gapminder_df.rename(columns={
-    "gdpPercap": "GDP per Capita",
-    "lifeExp": "Life Expectancy",
-    "pop": "Population",
-    "continent": "Continent",
-    "country": "Country",
-    "year": "Year",
-    "iso_alpha": "ISO Alpha Country Code"
-}, errors="ignore")
-
-# 如果 Year 是数值，确保为 int
-if pd.api.types.is_datetime64_any_dtype(gapminder_df.get("Year")):
-    gapminder_df["Year"] = gapminder_df["Year"].dt.year
-gapminder_df["Year"] = gapminder_df["Year"].astype(int)
+# 首次运行后将整理好的数据缓存为 parquet，之后的导入 / 热重载直接读取缓存
+# 修改 load_gapminder 中的数据整理逻辑后需递增版本号，旧缓存随之失效
+CACHE_VERSION = 1
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"gapminder_basic_v{CACHE_VERSION}.parquet")
+
+def write_cache(df):
+    # 先写临时文件再原子替换，多个 worker 同时启动时不会读到写了一半的文件；
+    # 目录不可写（如只读部署）或未安装 parquet 引擎时直接放弃缓存
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(CACHE_PATH), suffix=".tmp.parquet")
+    except OSError:
+        return
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, CACHE_PATH)
+    except (OSError, ImportError):
+        pass
+    finally:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+
+@functools.lru_cache(maxsize=1)
+def load_gapminder():
+    try:
+        return pd.read_parquet(CACHE_PATH)
+    except (OSError, ValueError, ImportError):
+        # 缓存不存在、无法读取或未安装 parquet 引擎时重新生成
+        pass
+
+    # 使用 gapminder()（注意：你原先使用了 gapminder(datetimes=True, centroids=True, pretty_names=True)）
+    # 保持兼容性：为确保 datetimes 可用，按你的环境选择相应调用；这里示例使用基本 gapminder()
+    df = gapminder()
+    # 标准化列名（根据你原数据的列名）
+    # 如果你的 gapminder 返回的是其他列名，请调整下面的列名映射
+    df = df.rename(columns={
+        "gdpPercap": "GDP per Capita",
+        "lifeExp": "Life Expectancy",
+        "pop": "Population",
+        "continent": "Continent",
+        "country": "Country",
+        "year": "Year",
+        "iso_alpha": "ISO Alpha Country Code"
+    }, errors="ignore")
+
+    # 如果 Year 是数值，确保为 int
+    if pd.api.types.is_datetime64_any_dtype(df.get("Year")):
+        df["Year"] = df["Year"].dt.year
+
+    # 压缩数值列与低基数字符串列的内存占用（Year 同时被转为整数）
+    df = df.astype({"Year": "int16", "Population": "int32", "Continent": "category"})
+    write_cache(df)
+    return df
+
+gapminder_df = load_gapminder()
+
+#################### PRECOMPUTED SLICES #########################
+METRICS = ("Population", "GDP per Capita", "Life Expectancy")
+METRIC_COLS = {"Population": "Population", "GDP": "GDP per Capita", "Life": "Life Expectancy"}
+
+YEAR_SLICES = {int(year): df for year, df in gapminder_df.groupby("Year", sort=False)}
+CONTINENT_YEAR_SLICES = {(continent, int(year)): df
+                         for (continent, year), df in gapminder_df.groupby(["Continent", "Year"], sort=False, observed=True)}
+
+TOP15 = {}
+for (continent, year), df in CONTINENT_YEAR_SLICES.items():
+    for metric in METRICS:
+        TOP15[(continent, int(year), metric)] = df.nlargest(15, metric)
 
 #################### STYLING / COLOR PALETTES ##################
 # 统一样式：使用 plotly_white 模板 + 柔和色板
@@ -39,117 +107,115 @@ COMMON_LAYOUT_KWARGS = dict(
     template=DEFAULT_TEMPLATE,
     font=dict(family="Inter, Arial, sans-serif", size=12),
 )
+# 柱状图与地图共享的 layout，模块加载时构建一次
+BAR_LAYOUT = dict(paper_bgcolor="rgba(0,0,0,0)", height=520, margin={"t":40, "l":10, "r":10, "b":10},
+                  **COMMON_LAYOUT_KWARGS)
+MAP_LAYOUT = dict(dragmode=False, paper_bgcolor="rgba(0,0,0,0)", height=520, margin={"l":0, "r":0, "b":0, "t":40},
+                  **COMMON_LAYOUT_KWARGS)
 
 #################### CHARTS #####################################
-def create_table():
-    # 使用 go.Table 并美化表头与交替行色
-    header_fill = "#0d6efd"  # bootstrap primary
-    header_font_color = "white"
-    cell_fill1 = "#ffffff"
-    cell_fill2 = "#f6f8fb"
-
-    fig = go.Figure(data=[go.Table(
-        header=dict(values=list(gapminder_df.columns),
-                    fill_color=header_fill,
-                    font=dict(color=header_font_color, size=13),
-                    align='left'),
-        cells=dict(values=[gapminder_df[col] for col in gapminder_df.columns],
-                   fill_color=[ [cell_fill1, cell_fill2] * (len(gapminder_df)//2 + 1) ],
-                   align='left',
-                   font=dict(color="#222222", size=11))
-    )])
-    fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", margin={"t":10, "l":0, "r":0, "b":0}, height=700, **COMMON_LAYOUT_KWARGS)
-    return fig
-
-def create_population_chart(continent="Asia", year=1952):
-    filtered_df = gapminder_df[(gapminder_df.Continent==continent) & (gapminder_df.Year==year)]
-    filtered_df = filtered_df.sort_values(by="Population", ascending=False).head(15)
-
-    fig = px.bar(filtered_df, x="Country", y="Population", color="Country",
-                 title=f"Population — {continent} — {year}",
-                 text_auto=True,
-                 color_discrete_sequence=CATEGORY_COLORS)
-    fig.update_layout(paper_bgcolor="rgba(0,0,0,0)",
-                      height=520,
-                      margin={"t":40, "l":10, "r":10, "b":10},
-                      template=DEFAULT_TEMPLATE,
-                      font=dict(family="Inter, Arial, sans-serif", size=12))
-    fig.update_traces(marker_line_width=0.5)
-    return fig
-
-
-def create_gdp_chart(continent="Asia", year=1952):
-    filtered_df = gapminder_df[(gapminder_df.Continent==continent) & (gapminder_df.Year==year)]
-    filtered_df = filtered_df.sort_values(by="GDP per Capita", ascending=False).head(15)
-
-    fig = px.bar(filtered_df, x="Country", y="GDP per Capita", color="Country",
-                 title=f"GDP per Capita — {continent} — {year}",
-                 text_auto=True,
-                 color_discrete_sequence=CATEGORY_COLORS)
-    fig.update_layout(paper_bgcolor="rgba(0,0,0,0)",
-                      height=520,
-                      margin={"t":40, "l":10, "r":10, "b":10},
-                      template=DEFAULT_TEMPLATE,
-                      font=dict(family="Inter, Arial, sans-serif", size=12))
-    fig.update_traces(marker_line_width=0.5)
-    return fig
-
-
-def create_life_exp_chart(continent="Asia", year=1952):
-    filtered_df = gapminder_df[(gapminder_df.Continent==continent) & (gapminder_df.Year==year)]
-    filtered_df = filtered_df.sort_values(by="Life Expectancy", ascending=False).head(15)
-
-    fig = px.bar(filtered_df, x="Country", y="Life Expectancy", color="Country",
-                 title=f"Life Expectancy — {continent} — {year}",
-                 text_auto=True,
-                 color_discrete_sequence=CATEGORY_COLORS)
-    fig.update_layout(paper_bgcolor="rgba(0,0,0,0)",
-                      height=520,
-                      margin={"t":40, "l":10, "r":10, "b":10},
-                      template=DEFAULT_TEMPLATE,
-                      font=dict(family="Inter, Arial, sans-serif", size=12))
-    fig.update_traces(marker_line_width=0.5)
+def cached_figure(factory):
+    # 按参数缓存图表的 JSON 字典（Dash 可直接接收 dict 形式的 figure），命中时无需再次校验；
+    # 返回浅拷贝，避免调用方替换顶层字段时改动缓存
+    cached = functools.lru_cache(maxsize=256)(lambda *args, **kwargs: factory(*args, **kwargs).to_plotly_json())
+
+    @functools.wraps(factory)
+    def wrapper(*args, **kwargs):
+        return dict(cached(*args, **kwargs))
+    wrapper.cache_info = cached.cache_info
+    return wrapper
+
+def create_metric_chart(metric_key, continent="Asia", year=1952):
+    col = METRIC_COLS[metric_key]
+    filtered_df = TOP15[(continent, int(year), col)]
+
+    # 单个 go.Bar 一次性构建 trace 与 layout，省去 px.bar 及 update_* 的重复校验
+    fig = go.Figure(
+        data=[go.Bar(x=filtered_df["Country"].to_numpy(),
+                     y=np.ascontiguousarray(filtered_df[col].to_numpy()),
+                     texttemplate="%{y}",
+                     marker=dict(color=[CATEGORY_COLORS[i % len(CATEGORY_COLORS)] for i in range(len(filtered_df))],
+                                 line=dict(width=0.5)),
+                     hovertemplate="Country=%{x}<br>" + col + "=%{y}<extra></extra>")],
+        layout=dict(BAR_LAYOUT,
+                    title=dict(text=f"{col} — {continent} — {year}"),
+                    xaxis=dict(title=dict(text="Country")),
+                    yaxis=dict(title=dict(text=col))))
     return fig
 
 
+@cached_figure
 def create_choropleth_map(variable, year):
-    filtered_df = gapminder_df[gapminder_df.Year==year]
-    fig = px.choropleth(filtered_df,
-                        color=variable,
-                        locations="ISO Alpha Country Code",
-                        locationmode="ISO-3",
-                        color_continuous_scale=CONTINUOUS_MAP,
-                        hover_data=["Country", variable],
-                        title=f"{variable} Choropleth — {year}")
-    fig.update_layout(dragmode=False,
-                      paper_bgcolor="rgba(0,0,0,0)",
-                      height=520,
-                      margin={"l":0, "r":0, "b":0, "t":40},
-                      template=DEFAULT_TEMPLATE,
-                      font=dict(family="Inter, Arial, sans-serif", size=12))
+    filtered_df = YEAR_SLICES[int(year)]
+    # 数值列以 ndarray 传入，Plotly 可按二进制 typed array 编码
+    fig = go.Figure(
+        data=[go.Choropleth(locations=filtered_df["ISO Alpha Country Code"].to_numpy(),
+                            locationmode="ISO-3",
+                            z=np.ascontiguousarray(filtered_df[variable].to_numpy()),
+                            colorscale=CONTINUOUS_MAP,
+                            colorbar=dict(title=dict(text=variable)),
+                            text=filtered_df["Country"].to_numpy(),
+                            hovertemplate="ISO Alpha Country Code=%{location}<br>Country=%{text}<br>" + variable + "=%{z}<extra></extra>")],
+        layout=dict(MAP_LAYOUT, title=dict(text=f"{variable} Choropleth — {year}")))
     return fig
 
 ##################### WIDGETS ####################################
-continents = sorted(gapminder_df.Continent.unique())
-years = sorted(gapminder_df.Year.unique())
+continents = list(gapminder_df["Continent"].cat.categories)
+years = np.sort(gapminder_df["Year"].unique()).tolist()
 
-def mk_dropdown(id, options, value):
-    return dcc.Dropdown(id=id, options=[{"label": o, "value": o} for o in options], value=value, clearable=False, style={"minWidth":"160px"})
-
-cont_population = mk_dropdown("cont_pop", continents, "Asia")
-year_population = mk_dropdown("year_pop", years, years[0])
+def mk_options(values):
+    return [{"label": v, "value": v} for v in values]
 
-cont_gdp = mk_dropdown("cont_gdp", continents, "Asia")
-year_gdp = mk_dropdown("year_gdp", years, years[0])
+# 选项列表只构建一次，所有下拉框共享
+CONTINENT_OPTS = mk_options(continents)
+YEAR_OPTS = mk_options(years)
+METRIC_OPTS = mk_options(METRICS)
 
-cont_life_exp = mk_dropdown("cont_life_exp", continents, "Asia")
-year_life_exp = mk_dropdown("year_life_exp", years, years[0])
+def mk_dropdown(id, options, value):
+    return dcc.Dropdown(id=id, options=options, value=value, clearable=False, style={"minWidth":"160px"})
+
+cont_population = mk_dropdown("cont_pop", CONTINENT_OPTS, "Asia")
+year_population = mk_dropdown("year_pop", YEAR_OPTS, years[0])
+
+cont_gdp = mk_dropdown("cont_gdp", CONTINENT_OPTS, "Asia")
+year_gdp = mk_dropdown("year_gdp", YEAR_OPTS, years[0])
+
+cont_life_exp = mk_dropdown("cont_life_exp", CONTINENT_OPTS, "Asia")
+year_life_exp = mk_dropdown("year_life_exp", YEAR_OPTS, years[0])
+
+year_map = mk_dropdown("year_map", YEAR_OPTS, years[0])
+var_map = mk_dropdown("var_map", METRIC_OPTS, "Life Expectancy")
+
+# 数据集使用虚拟化的 DataTable：只渲染可见行，保留原表格的表头配色与交替行色
+dataset_table = dash_table.DataTable(
+    id="dataset-table",
+    columns=[{"name": c, "id": c} for c in gapminder_df.columns],
+    data=gapminder_df.to_dict("records"),
+    virtualization=True,
+    page_size=50,
+    fixed_rows={"headers": True},
+    style_table={"height": "700px", "overflowY": "auto"},
+    style_header={"backgroundColor": "#0d6efd", "color": "white", "fontSize": 13},
+    style_cell={"textAlign": "left", "color": "#222222", "fontSize": 11,
+                "fontFamily": "Inter, Arial, sans-serif"},
+    style_data_conditional=[{"if": {"row_index": "odd"}, "backgroundColor": "#f6f8fb"}],
+)
 
-year_map = mk_dropdown("year_map", years, years[0])
-var_map = mk_dropdown("var_map", ["Population", "GDP per Capita", "Life Expectancy"], "Life Expectancy")
+##################### PRECOMPUTED FIGURES ####################################
+# 每张柱状图只由 (指标, 大洲, 年份) 决定：启动时全部生成并一次性下发，由前端按选择取用
+FIGS = {}
+for metric_key in METRIC_COLS:
+    for continent in continents:
+        for year in years:
+            fig = create_metric_chart(metric_key, continent, year).to_plotly_json()
+            layout = dict(fig["layout"])
+            # 所有图表共用同一模板：只下发一份，在前端合并回 layout
+            FIGS["template"] = layout.pop("template", None)
+            FIGS[f"{metric_key}|{continent}|{year}"] = dict(fig, layout=layout)
 
 ##################### APP LAYOUT ####################################
 app.layout = html.Div([
+    dcc.Store(id="figstore", data=FIGS),
     html.Div([
         html.H1("Gapminder Dataset Analysis", className="text-center fw-bold m-2"),
         html.P("Made it more colorful and added a download button", className="text-center text-muted mb-3"),
@@ -161,7 +227,7 @@ app.layout = html.Div([
                         html.Button("Download full dataset (CSV)", id="btn-download-dataset", className="btn btn-sm btn-primary me-2"),
                         dcc.Download(id="download-dataset")
                     ], className="mb-2"),
-                    dcc.Graph(id="dataset", figure=create_table())
+                    dataset_table
                 ])
             ], label="Dataset"),
             dcc.Tab([
@@ -172,7 +238,7 @@ app.layout = html.Div([
                     html.Div(html.Button("Download visible (CSV)", id="btn-download-pop", className="btn btn-sm btn-outline-primary ms-3")),
                     dcc.Download(id="download-pop")
                 ]),
-                dcc.Graph(id="population", figure=create_population_chart())
+                dcc.Graph(id="population")
             ], label="Population"),
             dcc.Tab([
                 html.Br(),
@@ -182,7 +248,7 @@ app.layout = html.Div([
                     html.Div(html.Button("Download visible (CSV)", id="btn-download-gdp", className="btn btn-sm btn-outline-primary ms-3")),
                     dcc.Download(id="download-gdp")
                 ]),
-                dcc.Graph(id="gdp", figure=create_gdp_chart())
+                dcc.Graph(id="gdp")
             ], label="GDP Per Capita"),
             dcc.Tab([
                 html.Br(),
@@ -192,7 +258,7 @@ app.layout = html.Div([
                     html.Div(html.Button("Download visible (CSV)", id="btn-download-life", className="btn btn-sm btn-outline-primary ms-3")),
                     dcc.Download(id="download-life")
                 ]),
-                dcc.Graph(id="life_expectancy", figure=create_life_exp_chart())
+                dcc.Graph(id="life_expectancy")
             ], label="Life Expectancy"),
             dcc.Tab([
                 html.Br(),
@@ -212,65 +278,67 @@ app.layout = html.Div([
 ], style={"background-color": "#dfeefb", "minHeight": "100vh"})
 
 ##################### CALLBACKS: UPDATE CHARTS ####################################
-@callback(Output("population", "figure"), [Input("cont_pop", "value"), Input("year_pop", "value")])
-def update_population_chart(continent, year):
-    return create_population_chart(continent, year)
-
-@callback(Output("gdp", "figure"), [Input("cont_gdp", "value"), Input("year_gdp", "value")])
-def update_gdp_chart(continent, year):
-    return create_gdp_chart(continent, year)
-
-@callback(Output("life_expectancy", "figure"), [Input("cont_life_exp", "value"), Input("year_life_exp", "value")])
-def update_life_exp_chart(continent, year):
-    return create_life_exp_chart(continent, year)
-
-@callback(Output("choropleth_map", "figure"), [Input("var_map", "value"), Input("year_map", "value")])
+PICK_FIGURE_JS = """function(continent, year, figs) {
+    var fig = figs['%s|' + continent + '|' + year];
+    return {data: fig.data, layout: Object.assign({template: figs.template}, fig.layout)};
+}"""
+
+clientside_callback(PICK_FIGURE_JS % "Population", Output("population", "figure"),
+                    Input("cont_pop", "value"), Input("year_pop", "value"), State("figstore", "data"))
+clientside_callback(PICK_FIGURE_JS % "GDP", Output("gdp", "figure"),
+                    Input("cont_gdp", "value"), Input("year_gdp", "value"), State("figstore", "data"))
+clientside_callback(PICK_FIGURE_JS % "Life", Output("life_expectancy", "figure"),
+                    Input("cont_life_exp", "value"), Input("year_life_exp", "value"), State("figstore", "data"))
+
+@callback(Output("choropleth_map", "figure"), [Input("var_map", "value"), Input("year_map", "value")], prevent_initial_call=True)
 def update_map(var_map, year):
     return create_choropleth_map(var_map, year)
 
 ##################### CALLBACKS: DOWNLOADS ####################################
+def to_csv_string(df):
+    # 使用 pyarrow 的 C++ CSV 写出器，比 DataFrame.to_csv 快得多
+    buf = io.BytesIO()
+    pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+    return buf.getvalue().decode()
+
+FULL_CSV = to_csv_string(gapminder_df)
+
 # Full dataset download
-@callback(Output("download-dataset", "data"), [Input("btn-download-dataset", "n_clicks")])
+@callback(Output("download-dataset", "data"), [Input("btn-download-dataset", "n_clicks")], prevent_initial_call=True)
 def download_full_dataset(n_clicks):
-    if not n_clicks:
-        return None
-    return dcc.send_data_frame(gapminder_df.to_csv, "gapminder_full.csv", index=False)
+    return dcc.send_string(FULL_CSV, "gapminder_full.csv")
 
 # Population tab download (current filters)
 @callback(Output("download-pop", "data"),
-          [Input("btn-download-pop", "n_clicks"), Input("cont_pop", "value"), Input("year_pop", "value")])
+          [Input("btn-download-pop", "n_clicks"), State("cont_pop", "value"), State("year_pop", "value")],
+          prevent_initial_call=True)
 def download_population(n_clicks, continent, year):
-    if not n_clicks:
-        return None
-    df = gapminder_df[(gapminder_df.Continent==continent) & (gapminder_df.Year==year)].sort_values(by="Population", ascending=False)
-    return dcc.send_data_frame(df.to_csv, f"population_{continent}_{year}.csv", index=False)
+    df = CONTINENT_YEAR_SLICES[(continent, int(year))].sort_values(by="Population", ascending=False)
+    return dcc.send_string(to_csv_string(df), f"population_{continent}_{year}.csv")
 
 # GDP tab download
 @callback(Output("download-gdp", "data"),
-          [Input("btn-download-gdp", "n_clicks"), Input("cont_gdp", "value"), Input("year_gdp", "value")])
+          [Input("btn-download-gdp", "n_clicks"), State("cont_gdp", "value"), State("year_gdp", "value")],
+          prevent_initial_call=True)
 def download_gdp(n_clicks, continent, year):
-    if not n_clicks:
-        return None
-    df = gapminder_df[(gapminder_df.Continent==continent) & (gapminder_df.Year==year)].sort_values(by="GDP per Capita", ascending=False)
-    return dcc.send_data_frame(df.to_csv, f"gdp_{continent}_{year}.csv", index=False)
+    df = CONTINENT_YEAR_SLICES[(continent, int(year))].sort_values(by="GDP per Capita", ascending=False)
+    return dcc.send_string(to_csv_string(df), f"gdp_{continent}_{year}.csv")
 
 # Life Expectancy tab download
 @callback(Output("download-life", "data"),
-          [Input("btn-download-life", "n_clicks"), Input("cont_life_exp", "value"), Input("year_life_exp", "value")])
+          [Input("btn-download-life", "n_clicks"), State("cont_life_exp", "value"), State("year_life_exp", "value")],
+          prevent_initial_call=True)
 def download_life(n_clicks, continent, year):
-    if not n_clicks:
-        return None
-    df = gapminder_df[(gapminder_df.Continent==continent) & (gapminder_df.Year==year)].sort_values(by="Life Expectancy", ascending=False)
-    return dcc.send_data_frame(df.to_csv, f"life_expectancy_{continent}_{year}.csv", index=False)
+    df = CONTINENT_YEAR_SLICES[(continent, int(year))].sort_values(by="Life Expectancy", ascending=False)
+    return dcc.send_string(to_csv_string(df), f"life_expectancy_{continent}_{year}.csv")
 
 # Map tab download (variable + year)
 @callback(Output("download-map", "data"),
-          [Input("btn-download-map", "n_clicks"), Input("var_map", "value"), Input("year_map", "value")])
+          [Input("btn-download-map", "n_clicks"), State("var_map", "value"), State("year_map", "value")],
+          prevent_initial_call=True)
 def download_map(n_clicks, var, year):
-    if not n_clicks:
-        return None
-    df = gapminder_df[gapminder_df.Year==year][["Country", "Continent", "Year", var, "ISO Alpha Country Code"]]
-    return dcc.send_data_frame(df.to_csv, f"choropleth_{var.replace(' ','_')}_{year}.csv", index=False)
+    df = YEAR_SLICES[int(year)][["Country", "Continent", "Year", var, "ISO Alpha Country Code"]]
+    return dcc.send_string(to_csv_string(df), f"choropleth_{var.replace(' ','_')}_{year}.csv")
 
 ##################### RUN ####################################
 if __name__ == "__main__":
@@ -1,4 +1,4 @@
-import threading, time, subprocess, shutil, re
+import threading, time, subprocess, shutil, re, os, selectors, socket
 
 # Kill previous instances
 subprocess.run(['pkill', '-f', 'streamlit'], capture_output=True)
@@ -11,7 +11,17 @@ def run_streamlit():
 # Start Streamlit in a separate thread
 threading.Thread(target=run_streamlit, daemon=True).start()
 print("🚀 Starting Streamlit...")
-time.sleep(8)
+
+# Wait until Streamlit accepts connections on its port (give up after 30s)
+deadline = time.time() + 30
+while time.time() < deadline:
+    try:
+        socket.create_connection(("127.0.0.1", 8501), timeout=0.2).close()
+        break
+    except OSError:
+        time.sleep(0.1)
+else:
+    print("⚠️ Streamlit did not start accepting connections on port 8501 within 30s; the tunnel may not work.")
 
 # Locate the LocalTunnel executable
 lt_path = shutil.which("lt")
@@ -21,10 +31,22 @@ if not lt_path:
 print("🌐 Starting LocalTunnel...")
 p = subprocess.Popen([lt_path, '--port', '8501'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
 
-for line in iter(p.stdout.readline, b''):
-    decoded = line.decode()
-    print(decoded.strip())
-    match = re.search(r'(https://[^\s]+\.loca\.lt)', decoded)
-    if match:
-        print(f"\n✅ Your Streamlit app is live at: {match.group(1)}")
-        break
\ No newline at end of file
+# Read raw chunks as they arrive and scan the bytes buffer until the URL shows up
+url_pattern = re.compile(rb'https://[^\s]+\.loca\.lt')
+sel = selectors.DefaultSelector()
+sel.register(p.stdout, selectors.EVENT_READ)
+fd = p.stdout.fileno()
+buf = b""
+match = None
+while match is None:
+    sel.select()
+    chunk = os.read(fd, 4096)
+    if not chunk:
+        break
+    print(chunk.decode(errors="replace"), end="")
+    buf += chunk
+    match = url_pattern.search(buf)
+sel.close()
+
+if match:
+    print(f"\n✅ Your Streamlit app is live at: {match.group(0).decode()}")
\ No newline at end of file